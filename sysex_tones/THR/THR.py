@@ -48,7 +48,8 @@ class THR( _BasicIO ):
 		""" Check data for known types of THR MIDI data. """
 		retval= []
 		if len( data ) == _THR_CONSTANTS.THR_FILE_SIZE:
-			unknownprefix = data[:len( _THR_CONSTANTS.THR_UNKNOWN_PREFIX )]
+			# list() so bytes-like data compares equal to the constant lists
+			unknownprefix = list( data[:len( _THR_CONSTANTS.THR_UNKNOWN_PREFIX )] )
 			if unknownprefix == _THR_CONSTANTS.THR_UNKNOWN_PREFIX:
 				retval = {
 					'type': 'ydl',
@@ -59,7 +60,7 @@ class THR( _BasicIO ):
 				# -2 is the list offset for the checksum byte
 				payload = data[len( _THR_CONSTANTS.THR_DUMP_HEADER_PREFIX ):-2]
 				if _sysex_tones.THR.is_valid_checksum( payload, data[-2] ):
-					header = data[:len( _THR_CONSTANTS.THR_DUMP_HEADER )]
+					header = list( data[:len( _THR_CONSTANTS.THR_DUMP_HEADER )] )
 					if header == _THR_CONSTANTS.THR_DUMP_HEADER:
 						retval = {
 							'type': 'dump',
@@ -93,7 +93,7 @@ class THR10( _THR ):
 			self.open_outfile()
 			opened = True
 		if self.outfile:
-			_THR.write_data_to_outfile( self, _sysex_tones.convert_to_stream( data ) )
+			_THR.write_data_to_outfile( self, data ) # converted once, by BasicIO
 		if opened:
 			self.close_outfile()
 
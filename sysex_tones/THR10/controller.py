@@ -1,5 +1,6 @@
 """THR10 controller for live/staged state management."""
 
+import selectors
 import time
 from typing import Callable, Optional
 
@@ -9,6 +10,31 @@ from sysex_tones.THR10 import THR10 as _THR10
 from sysex_tones.THR10 import state as thr10_state
 
 
+# upper bound for the poll backoff used when MIDI input can't be waited on directly
+_MAX_POLL_INTERVAL = 0.1
+
+# top-level state fields that are sent to the device, edited/stored are local bookkeeping
+_DEVICE_GROUPS = frozenset( ('name', 'amp', 'cab', 'compressor', 'modulation', 'delay', 'reverb', 'gate') )
+
+# shared "nothing staged" state for diffing, never handed out through staged_state or mutated
+_EMPTY_STATE = thr10_state.THR10State()
+
+_FIELD_GROUPS = frozenset( path.split( '.', 1 )[0] for path in thr10_state.FIELD_PATHS if '.' in path )
+
+
+def _build_path_aliases() -> dict:
+	"""Map the common spellings of every field path ('delay/high cut', 'delay.high-cut', ...) to its dotted path."""
+	retval = {}
+	for path in thr10_state.FIELD_PATHS:
+		for separator in ('.', '/'):
+			for joiner in ('_', '-', ' '):
+				retval[path.replace( '_', joiner ).replace( '.', separator )] = path
+	return retval
+
+
+_PATH_ALIASES = _build_path_aliases()
+
+
 class THR10Controller:
 	"""Manage live/staged THR10 state with debounced device writes."""
 
@@ -19,94 +45,244 @@ class THR10Controller:
 		debounce_seconds: float = 0.3,
 		poll_interval: float = 0.05,
 		clock: Callable[[], float] = time.monotonic,
+		write_chunk_size: Optional[int] = None,
+		inter_chunk_delay: float = 0.0,
+		verify_writes: bool = True,
+		verify_timeout: float = 0.3,
+		verify_attempts: int = 3,
 	):
 		self.thr = _THR10( midi_in, midi_out )
 		self.live_state = thr10_state.THR10State()
-		self.staged_state = thr10_state.THR10State()
+		self._staged_state = None
 		self.conflicts = {}
 		self.debounce_seconds = debounce_seconds
 		self.poll_interval = poll_interval
 		self._clock = clock
+		self.write_chunk_size = write_chunk_size
+		self.inter_chunk_delay = inter_chunk_delay
+		self.verify_writes = verify_writes
+		self.verify_timeout = verify_timeout
+		self.verify_attempts = verify_attempts
+		self._failed_verifications = 0
 		self._last_edit_time = None
+		self._edit_ticket = 0
+		self._flushed_ticket = 0
 		self._pending_apply = False
+		self._pending_edits = {}
+		self._last_dump = None
+		self._last_device_state = None
+
+	@property
+	def staged_state( self ) -> thr10_state.THR10State:
+		"""Staged edits not yet applied, allocated on first access.
+
+		set_param buffers its edits, they only show up here once flush_debounced, apply_staged or refresh_from_device drains them.
+		"""
+		if self._staged_state is None:
+			self._staged_state = thr10_state.THR10State()
+		return self._staged_state
 
 	def refresh_from_device( self, midi_in=None, midi_out=None, timeout_s: Optional[float] = 1.0 ):
 		"""Request and refresh the live state from the THR10 device."""
 		if midi_in:
 			self.thr.open_infile_wait_indefinitely( midi_in )
-		if midi_out or self.thr.outfilename:
-			self.thr.request_current_settings( midi_out )
-		else:
-			self.thr.request_current_settings()
-		start = self._clock()
-		attempt = None
-		while True:
-			attempt = self.thr.extract_dump()
-			if attempt:
-				break
-			if timeout_s is None:
-				break
-			if self._clock() - start >= timeout_s:
-				break
-			time.sleep( self.poll_interval )
-		if not attempt:
+		device_state = self._read_device_state( midi_out, timeout_s )
+		if device_state is None:
 			return None
-		lines = sysex_tones.THR10.convert_midi_dump_to_text( attempt['dump'] )
-		device_state = thr10_state.from_text_settings( lines )
 		self._detect_conflicts( device_state )
 		self.live_state = device_state
 		return device_state
 
 	def apply_staged( self ):
-		"""Apply staged settings to the device and refresh live state."""
-		diffs = thr10_state.diff_state( self.live_state, self.staged_state )
+		"""Apply staged settings to the device and refresh live state.
+
+		When verify_writes is set and MIDI input is open, live state is only updated after the device reports the written values.
+		A write that isn't confirmed is retried by later flushes, after verify_attempts failures it is reported in conflicts
+		and left staged until the next edit.
+		"""
+		self._drain_pending_edits()
+		staged = self._staged_or_empty()
+		diffs = thr10_state.diff_state( self.live_state, staged )
 		if not diffs:
 			self._pending_apply = False
 			return False
-		merged = thr10_state.apply_state( self.live_state, self.staged_state )
-		self._write_state( merged )
+		merged = thr10_state.apply_state( self.live_state, staged )
+		if any( path.split( '.', 1 )[0] in _DEVICE_GROUPS for path in diffs ):
+			self._write_state( merged, diffs )
+			mismatches = self._verify_write( merged, diffs )
+			if mismatches is not None:
+				self._failed_verifications += 1
+				if self._failed_verifications >= self.verify_attempts:
+					# stop retrying until the next edit, and report what the device holds instead
+					self._pending_apply = False
+					self._failed_verifications = 0
+					self.conflicts = {
+						path: {'live': diffs[path]['live'], 'staged': diffs[path]['staged'], 'device': device}
+						for path, device in mismatches.items()
+					}
+				# otherwise the staged edits are kept, so the next flush retries the write
+				return False
+		self._failed_verifications = 0
 		self.live_state = merged
-		self.staged_state = thr10_state.THR10State()
+		self._staged_state = None
 		self._pending_apply = False
 		self.conflicts = {}
 		return True
 
 	def discard_staged( self ):
 		"""Discard staged edits."""
-		self.staged_state = thr10_state.THR10State()
+		self._staged_state = None
+		self._pending_edits.clear()
 		self._pending_apply = False
+		self._failed_verifications = 0
 		self.conflicts = {}
 
 	def set_param( self, path: str, value ):
-		"""Stage a parameter update using a dotted path."""
-		self._set_state_value( self.staged_state, path, value )
+		"""Stage a parameter update using a dotted path, applied to staged_state at the next flush."""
+		self._pending_edits[self._canonical_path( path )] = value
 		self._pending_apply = True
-		self._last_edit_time = self._clock()
+		self._failed_verifications = 0
+		self._edit_ticket += 1
 
 	def flush_debounced( self, force: bool = False ) -> bool:
-		"""Apply staged edits after debounce idle time or when forced."""
+		"""Apply staged edits after debounce idle time or when forced.
+
+		Edits are timestamped by the first flush that sees them, so idle time is measured from that flush.
+		"""
 		if not self._pending_apply:
 			return False
 		if force:
 			return self.apply_staged()
-		if self._last_edit_time is None:
+		if self._edit_ticket != self._flushed_ticket:
+			self._last_edit_time = self._clock()
+			self._flushed_ticket = self._edit_ticket
 			return False
 		if self._clock() - self._last_edit_time < self.debounce_seconds:
 			return False
 		return self.apply_staged()
 
-	def _write_state( self, state: thr10_state.THR10State ) -> None:
-		lines = thr10_state.to_text_settings( state )
-		payload = []
+	def _read_device_state( self, midi_out=None, timeout_s: Optional[float] = 1.0 ) -> Optional[thr10_state.THR10State]:
+		"""Request a settings dump and decode it, returning None if none arrived within timeout_s."""
+		if midi_out or self.thr.outfilename:
+			self.thr.request_current_settings( midi_out )
+		else:
+			self.thr.request_current_settings()
+		start = self._clock()
+		interval = self.poll_interval
+		selector = self._open_input_selector()
+		attempt = None
+		try:
+			while True:
+				attempt = self.thr.extract_dump()
+				if attempt:
+					break
+				if timeout_s is None:
+					break
+				remaining = timeout_s - ( self._clock() - start )
+				if remaining <= 0:
+					break
+				interval = self._wait_for_dump( selector, remaining, interval )
+		finally:
+			if selector is not None:
+				selector.close()
+		if not attempt:
+			return None
+		dump = bytes( attempt['dump'] )
+		if dump == self._last_dump and self.live_state is self._last_device_state:
+			# unchanged dump, and live state is still the one decoded from it
+			return self.live_state
+		lines = sysex_tones.THR10.convert_midi_dump_to_text( attempt['dump'] )
+		device_state = thr10_state.from_text_settings( lines )
+		self._last_dump = dump
+		self._last_device_state = device_state
+		return device_state
+
+	def _verify_write( self, merged: thr10_state.THR10State, diffs: dict ) -> Optional[dict]:
+		"""Re-read the device after a write, returning None once it confirms the written paths.
+
+		Otherwise returns the device value of every written path it reports differently, empty if it didn't answer.
+		"""
+		if not self.verify_writes or self.thr.infile is None:
+			return None
+		device_state = self._read_device_state( timeout_s=self.verify_timeout )
+		if device_state is None:
+			return {}
+		# compare against what the device makes of the written data ('crunch' -> 'Crunch', out of range values clamped),
+		# settings it leaves out (e.g. for disabled effects) are None and don't count
+		expected = thr10_state.from_text_settings(
+			sysex_tones.THR10.convert_midi_dump_to_text( thr10_state.to_midi_data( merged ) )
+		)
+		device_diffs = thr10_state.diff_state( expected, device_state )
+		mismatches = {path: device_diffs[path]['staged'] for path in diffs if path in device_diffs}
+		if not mismatches:
+			return None
+		return mismatches
+
+	def _open_input_selector( self ) -> Optional[selectors.BaseSelector]:
+		"""Return a selector watching the MIDI input, or None when the input can't be waited on."""
+		if self.thr.infile is None:
+			return None
+		selector = selectors.DefaultSelector()
+		try:
+			selector.register( self.thr.infile, selectors.EVENT_READ )
+		except (OSError, ValueError):
+			selector.close()
+			return None
+		return selector
+
+	def _wait_for_dump( self, selector: Optional[selectors.BaseSelector], timeout: float, interval: float ) -> float:
+		"""Wait for MIDI input to become readable, returning the next fallback poll interval."""
+		if selector is not None:
+			selector.select( timeout )
+			return interval
+		time.sleep( min( interval, timeout ) )
+		return min( interval * 1.5, _MAX_POLL_INTERVAL )
+
+	def _write_state( self, state: thr10_state.THR10State, diffs: Optional[dict] = None ) -> None:
+		groups = self._groups_for_diffs( diffs )
+		if groups is None:
+			lines = thr10_state.to_text_settings( state )
+		else:
+			lines = thr10_state.to_group_text_settings( state, groups )
+		chunks = [bytearray()]
 		for line in lines:
 			command = sysex_tones.THR10.convert_text_to_midi( line )
-			if command:
-				payload += command
-		if payload:
-			self.thr.write_data_to_outfile( payload )
+			if not command:
+				continue
+			if not self.write_chunk_size:
+				chunks[-1].extend( command )
+				continue
+			# only split between SysEx messages, never inside one
+			for sysex in sysex_tones.extract_midi_sysex( command ):
+				if chunks[-1] and len( chunks[-1] ) + len( sysex ) > self.write_chunk_size:
+					chunks.append( bytearray() )
+				chunks[-1].extend( sysex )
+		if not chunks[-1]:
+			return
+		for index, chunk in enumerate( chunks ):
+			if index and self.inter_chunk_delay:
+				time.sleep( self.inter_chunk_delay )
+			self.thr.write_data_to_outfile( chunk )
+
+	@staticmethod
+	def _groups_for_diffs( diffs: Optional[dict] ) -> Optional[set]:
+		"""Return the top-level state groups touched by diffs, or None when the full state should be written."""
+		if diffs is None:
+			return None
+		groups = set()
+		for path in diffs:
+			group = path.split( '.', 1 )[0]
+			if group == 'name':
+				return None
+			groups.add( group )
+		return groups
 
 	def _detect_conflicts( self, device_state: thr10_state.THR10State ) -> None:
-		staged_diffs = thr10_state.diff_state( self.live_state, self.staged_state )
+		if not self._pending_apply and not self._pending_edits:
+			self.conflicts = {}
+			return
+		self._drain_pending_edits()
+		staged_diffs = thr10_state.diff_state( self.live_state, self._staged_or_empty() )
 		device_diffs = thr10_state.diff_state( self.live_state, device_state )
 		self.conflicts = {}
 		if not staged_diffs or not device_diffs:
@@ -121,20 +297,40 @@ class THR10Controller:
 				'device': device_diff['staged'],
 			}
 
-	def _set_state_value( self, state: thr10_state.THR10State, path: str, value ) -> None:
+	def _drain_pending_edits( self ) -> None:
+		if not self._pending_edits:
+			return
+		staged = self.staged_state
+		for path, value in self._pending_edits.items():
+			self._set_state_value( staged, path, value )
+		self._pending_edits.clear()
+
+	def _staged_or_empty( self ) -> thr10_state.THR10State:
+		"""Return the staged state without allocating one when nothing is staged."""
+		if self._staged_state is None:
+			return _EMPTY_STATE
+		return self._staged_state
+
+	def _canonical_path( self, path: str ) -> str:
+		retval = _PATH_ALIASES.get( path )
+		if retval is None:
+			retval = self._normalize_path( path )
+		return retval
+
+	def _normalize_path( self, path: str ) -> str:
 		parts = [part for part in path.replace( '/', '.' ).split( '.' ) if part]
 		if not parts:
 			raise ValueError( 'Parameter path is empty.' )
-		cursor = state
-		for part in parts[:-1]:
-			name = self._normalize_field( part )
-			if not hasattr( cursor, name ):
-				raise AttributeError( 'Unknown parameter group: %s' % ( part, ) )
-			cursor = getattr( cursor, name )
-		last = self._normalize_field( parts[-1] )
-		if not hasattr( cursor, last ):
+		names = [self._normalize_field( part ) for part in parts]
+		normalized = '.'.join( names )
+		if normalized not in thr10_state.FIELD_SETTERS:
+			if len( names ) > 1 and names[0] not in _FIELD_GROUPS:
+				raise AttributeError( 'Unknown parameter group: %s' % ( parts[0], ) )
 			raise AttributeError( 'Unknown parameter: %s' % ( parts[-1], ) )
-		setattr( cursor, last, value )
+		return normalized
+
+	def _set_state_value( self, state: thr10_state.THR10State, path: str, value ) -> None:
+		thr10_state.FIELD_SETTERS[self._canonical_path( path )]( state, value )
 
 	@staticmethod
 	def _normalize_field( name: str ) -> str:
@@ -13,8 +13,9 @@
 # GNU Affero General Public License for more details.
 
 
-from dataclasses import dataclass, field, fields, is_dataclass
-import struct as _struct
+from dataclasses import dataclass, field, fields, is_dataclass, replace
+import operator as _operator
+import sys as _sys
 from typing import Iterable, Optional
 
 import sysex_tones as _sysex_tones
@@ -24,6 +25,10 @@ from sysex_tones.THR10 import CONSTANTS as _THR10_CONSTANTS
 from sysex_tones.THR10 import convert_data as _convert_data
 
 
+# __slots__ state classes where supported (Python 3.10+)
+_DATACLASS_OPTIONS = {'slots': True} if _sys.version_info >= (3, 10) else {}
+
+
 _AMP_INDEX = 128
 _CONTROL_INDICES = {
 	'gain': 129,
@@ -78,8 +83,31 @@ _GATE_THRESHOLD_INDEX = 209
 _GATE_RELEASE_INDEX = 210
 _GATE_ON_INDEX = 223
 
+# (field, data index, limits) for each amp control, resolved once at import
+_AMP_WRITES = tuple(
+	(key, idx, tuple( _THR10_CONSTANTS.THR10_STREAM_LIMITS['control'][key] ))
+	for key, idx in _CONTROL_INDICES.items()
+)
+_DELAY_LIMITS = _THR10_CONSTANTS.THR10_STREAM_LIMITS['delay']
+_REVERB_LIMITS = _THR10_CONSTANTS.THR10_STREAM_LIMITS['reverb']
+_GATE_LIMITS = _THR10_CONSTANTS.THR10_STREAM_LIMITS['gate']
+
+
+def _lowered_options( options: list[str] ) -> dict:
+	return {option.lower(): (index, option) for index, option in enumerate( options )}
+
 
-@dataclass
+# lowercase option name -> (index, canonical option name)
+_AMP_OPTIONS = _lowered_options( _THR10_CONSTANTS.THR10_AMP_NAMES )
+_CAB_OPTIONS = _lowered_options( _THR10_CONSTANTS.THR10_CAB_NAMES )
+_COMPRESSOR_OPTIONS = _lowered_options( _THR10_CONSTANTS.THR10_COMPRESSOR_NAMES )
+_MODULATION_OPTIONS = _lowered_options( _THR10_CONSTANTS.THR10_MODULATION_NAMES )
+_REVERB_OPTIONS = _lowered_options( _THR10_CONSTANTS.THR10_REVERB_NAMES )
+_RATIO_OPTIONS = _lowered_options( _THR10_CONSTANTS.THR10_RATIO_NAMES )
+_KNEE_OPTIONS = _lowered_options( _THR10_CONSTANTS.THR10_KNEE_NAMES )
+
+
+@dataclass(**_DATACLASS_OPTIONS)
 class AmpState:
 	model: Optional[str] = None
 	gain: Optional[int] = None
@@ -89,12 +117,12 @@ class AmpState:
 	treble: Optional[int] = None
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class CabState:
 	model: Optional[str] = None
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class CompressorState:
 	on: Optional[bool] = None
 	kind: Optional[str] = None
@@ -107,7 +135,7 @@ class CompressorState:
 	knee: Optional[str] = None
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class ModulationState:
 	on: Optional[bool] = None
 	kind: Optional[str] = None
@@ -120,7 +148,7 @@ class ModulationState:
 	freq: Optional[int] = None
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class DelayState:
 	on: Optional[bool] = None
 	time: Optional[int] = None
@@ -130,7 +158,7 @@ class DelayState:
 	level: Optional[int] = None
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class ReverbState:
 	on: Optional[bool] = None
 	kind: Optional[str] = None
@@ -145,14 +173,14 @@ class ReverbState:
 	filter: Optional[int] = None
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class GateState:
 	on: Optional[bool] = None
 	threshold: Optional[int] = None
 	release: Optional[int] = None
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class THR10State:
 	name: Optional[str] = None
 	edited: Optional[bool] = None
@@ -166,6 +194,50 @@ class THR10State:
 	gate: GateState = field(default_factory=GateState)
 
 
+def _make_setter( group: Optional[str], name: str ):
+	if group is None:
+		return lambda state, value: setattr( state, name, value )
+	get_group = _operator.attrgetter( group )
+	return lambda state, value: setattr( get_group( state ), name, value )
+
+
+def _build_state_fields() -> tuple:
+	"""Walk THR10State once, returning (path, group, name, getter) for every leaf field."""
+	retval = []
+	for top in fields( THR10State ):
+		if is_dataclass( top.type ):
+			for leaf in fields( top.type ):
+				path = '%s.%s' % (top.name, leaf.name)
+				retval.append( (path, top.name, leaf.name, _operator.attrgetter( path )) )
+		else:
+			retval.append( (top.name, None, top.name, _operator.attrgetter( top.name )) )
+	return tuple( retval )
+
+
+_STATE_FIELDS = _build_state_fields()
+_STATE_GROUPS = tuple( top.name for top in fields( THR10State ) if is_dataclass( top.type ) )
+
+
+def _build_diff_groups() -> tuple:
+	"""Group the flat field table as (group getter, empty group, ((path, getter), ...)), top-level fields first."""
+	retval = [(None, None, tuple( (path, getter) for path, group, _name, getter in _STATE_FIELDS if group is None ))]
+	empty_state = THR10State()
+	for group in _STATE_GROUPS:
+		group_getter = _operator.attrgetter( group )
+		group_fields = tuple( (path, _operator.attrgetter( name )) for path, field_group, name, _getter in _STATE_FIELDS if field_group == group )
+		retval.append( (group_getter, group_getter( empty_state ), group_fields) )
+	return tuple( retval )
+
+
+_DIFF_GROUPS = _build_diff_groups()
+
+# dotted paths of every leaf THR10State field, e.g. 'name' or 'amp.gain'
+FIELD_PATHS = tuple( path for path, _group, _name, _getter in _STATE_FIELDS )
+
+# setter( state, value ) for every leaf field, keyed like FIELD_PATHS
+FIELD_SETTERS = {path: _make_setter( group, name ) for path, group, name, _getter in _STATE_FIELDS}
+
+
 def from_text_settings( lines: Iterable[str] ) -> THR10State:
 	"""Parse text settings strings into a THR10State."""
 	state = THR10State()
@@ -182,57 +254,9 @@ def from_text_settings( lines: Iterable[str] ) -> THR10State:
 		if not text or text.startswith( '#' ):
 			continue
 		(setting, valuelist, values) = _sysex_tones.extract_settings( text )
-		if not setting:
-			continue
-		if setting == 'name':
-			state.name = valuelist.strip()
-			continue
-		if setting in ('edited', 'edit'):
-			state.edited = _parse_on_off( values )
-			continue
-		if setting == 'stored':
-			state.stored = _parse_on_off( values )
-			continue
-		if setting == 'amp':
-			state.amp.model = _canonical_option( _first_key( values ), _THR10_CONSTANTS.THR10_AMP_NAMES )
-			continue
-		if setting == 'control':
-			_assign_int_fields( state.amp, values, ['gain', 'master', 'bass', 'middle', 'treble'] )
-			continue
-		if setting == 'cab':
-			state.cab.model = _canonical_option( _first_key( values ), _THR10_CONSTANTS.THR10_CAB_NAMES )
-			continue
-		if setting == 'compressor':
-			state.compressor.on = _merge_bool( state.compressor.on, _parse_on_off( values ) )
-			compressor_type = _first_match( values, _THR10_CONSTANTS.THR10_COMPRESSOR_NAMES )
-			if compressor_type:
-				state.compressor.kind = compressor_type
-			_assign_int_fields( state.compressor, values, ['sustain', 'output', 'threshold', 'attack', 'release'] )
-			state.compressor.ratio = _canonical_option( _value_or_key( values, 'ratio' ), _THR10_CONSTANTS.THR10_RATIO_NAMES )
-			state.compressor.knee = _canonical_option( _value_or_key( values, 'knee' ), _THR10_CONSTANTS.THR10_KNEE_NAMES )
-			continue
-		if setting == 'modulation':
-			state.modulation.on = _merge_bool( state.modulation.on, _parse_on_off( values ) )
-			modulation_type = _first_match( values, _THR10_CONSTANTS.THR10_MODULATION_NAMES )
-			if modulation_type:
-				state.modulation.kind = modulation_type
-			_assign_int_fields( state.modulation, values, ['speed', 'depth', 'mix', 'manual', 'feedback', 'spread', 'freq'] )
-			continue
-		if setting == 'delay':
-			state.delay.on = _merge_bool( state.delay.on, _parse_on_off( values ) )
-			_assign_int_fields( state.delay, values, ['time', 'feedback', 'high cut', 'low cut', 'level'] )
-			continue
-		if setting == 'reverb':
-			state.reverb.on = _merge_bool( state.reverb.on, _parse_on_off( values ) )
-			reverb_type = _first_match( values, _THR10_CONSTANTS.THR10_REVERB_NAMES )
-			if reverb_type:
-				state.reverb.kind = reverb_type
-			_assign_int_fields( state.reverb, values, ['time', 'pre', 'low cut', 'high cut', 'high ratio', 'low ratio', 'level', 'reverb', 'filter'] )
-			continue
-		if setting == 'gate':
-			state.gate.on = _merge_bool( state.gate.on, _parse_on_off( values ) )
-			_assign_int_fields( state.gate, values, ['threshold', 'release'] )
-			continue
+		handler = _SETTING_HANDLERS.get( setting )
+		if handler:
+			handler( state, valuelist, values )
 	return state
 
 
@@ -247,26 +271,32 @@ def to_text_settings( state: THR10State ) -> list[str]:
 		retval.append( _boolean_setting_to_string( 'Edited', state.edited ) )
 	if state.stored is not None:
 		retval.append( _boolean_setting_to_string( 'Stored', state.stored ) )
-	retval.append( _convert_data.amp_data_to_string( data, comment ) )
-	retval.append( _convert_data.control_data_to_string( data ) )
-	retval.append( _convert_data.cab_data_to_string( data, comment ) )
-	retval += _convert_data.compressor_data_to_strings( data, comment )
-	retval += _convert_data.modulation_data_to_strings( data, comment )
-	retval += _convert_data.delay_data_to_strings( data, comment )
-	retval += _convert_data.reverb_data_to_strings( data, comment )
-	retval += _convert_data.gate_data_to_strings( data, comment )
+	for _group, _apply, serializer in _GROUP_SERIALIZERS:
+		retval += serializer( data, comment )
+	return retval
+
+
+def to_group_text_settings( state: THR10State, groups: Iterable[str] ) -> list[str]:
+	"""Serialize only the named top-level groups (amp, cab, compressor, ...) of a THR10State into text settings strings."""
+	data = bytearray( _THR_CONSTANTS.THR_SYSEX_SIZE )
+	comment = '# '
+	retval = []
+	for group, apply, serializer in _GROUP_SERIALIZERS:
+		if group in groups:
+			apply( data, getattr( state, group ) )
+			retval += serializer( data, comment )
 	return retval
 
 
 def to_midi_data( state: THR10State ) -> list:
 	"""Serialize a THR10State into raw THR10 settings data."""
-	return _state_to_data( state )
+	return list( _state_to_data( state ) )
 
 
 def diff_state( live: THR10State, staged: THR10State ) -> dict:
 	"""Return a dictionary of differences between live and staged state."""
 	diffs = {}
-	_diff_values( live, staged, '', diffs )
+	_diff_values( live, staged, diffs )
 	return diffs
 
 
@@ -280,46 +310,37 @@ def merge_state( live: THR10State, staged: THR10State ) -> THR10State:
 	return apply_state( live, staged )
 
 
-def _state_to_data( state: THR10State ) -> list:
-	data = [0] * _THR_CONSTANTS.THR_SYSEX_SIZE
+def _state_to_data( state: THR10State ) -> bytearray:
+	data = bytearray( _THR_CONSTANTS.THR_SYSEX_SIZE )
 	_apply_name( data, state.name )
-	_apply_amp( data, state.amp )
-	_apply_cab( data, state.cab )
-	_apply_compressor( data, state.compressor )
-	_apply_modulation( data, state.modulation )
-	_apply_delay( data, state.delay )
-	_apply_reverb( data, state.reverb )
-	_apply_gate( data, state.gate )
+	for group, apply, _serializer in _GROUP_SERIALIZERS:
+		apply( data, getattr( state, group ) )
 	return data
 
 
-def _apply_name( data: list, name: Optional[str] ) -> None:
+def _apply_name( data: bytearray, name: Optional[str] ) -> None:
 	if not name:
 		return
-	name_bytes = name.encode( 'ascii', errors='ignore' )[:_THR_CONSTANTS.THR_SETTINGS_NAME_SIZE]
-	for index in range( _THR_CONSTANTS.THR_SETTINGS_NAME_SIZE ):
-		data[index] = 0
-	for index, val in enumerate( name_bytes ):
-		data[index] = val
+	size = _THR_CONSTANTS.THR_SETTINGS_NAME_SIZE
+	name_bytes = name.encode( 'ascii', errors='ignore' )[:size]
+	data[:size] = name_bytes + bytes( size - len( name_bytes ) )
 
 
-def _apply_amp( data: list, amp: AmpState ) -> None:
-	index = _option_index( amp.model, _THR10_CONSTANTS.THR10_AMP_NAMES, default=0 )
+def _apply_amp( data: bytearray, amp: AmpState ) -> None:
+	index = _option_index( amp.model, _AMP_OPTIONS, default=0 )
 	data[_AMP_INDEX] = index
-	for key, idx in _CONTROL_INDICES.items():
-		limits = _THR10_CONSTANTS.THR10_STREAM_LIMITS['control'][key]
-		value = getattr( amp, key )
-		data[idx] = _limit_value( value, limits )
+	for key, idx, limits in _AMP_WRITES:
+		data[idx] = _limit_value( getattr( amp, key ), limits )
 
 
-def _apply_cab( data: list, cab: CabState ) -> None:
-	index = _option_index( cab.model, _THR10_CONSTANTS.THR10_CAB_NAMES, default=0 )
+def _apply_cab( data: bytearray, cab: CabState ) -> None:
+	index = _option_index( cab.model, _CAB_OPTIONS, default=0 )
 	data[_CAB_INDEX] = index
 
 
-def _apply_compressor( data: list, compressor: CompressorState ) -> None:
+def _apply_compressor( data: bytearray, compressor: CompressorState ) -> None:
 	kind = _infer_compressor_kind( compressor )
-	kind_index = _option_index( kind, _THR10_CONSTANTS.THR10_COMPRESSOR_NAMES, default=0 )
+	kind_index = _option_index( kind, _COMPRESSOR_OPTIONS, default=0 )
 	data[_COMPRESSOR_TYPE_INDEX] = kind_index
 	data[_COMPRESSOR_ON_INDEX] = _on_off_value( compressor.on )
 	if kind_index == 0:
@@ -331,14 +352,14 @@ def _apply_compressor( data: list, compressor: CompressorState ) -> None:
 		_set_midi_int( data, _COMPRESSOR_RACK_THRESHOLD_INDEX, _limit_value( compressor.threshold, limits['threshold'] ) )
 		data[_COMPRESSOR_RACK_ATTACK_INDEX] = _limit_value( compressor.attack, limits['attack'] )
 		data[_COMPRESSOR_RACK_RELEASE_INDEX] = _limit_value( compressor.release, limits['release'] )
-		data[_COMPRESSOR_RACK_RATIO_INDEX] = _option_index( compressor.ratio, _THR10_CONSTANTS.THR10_RATIO_NAMES, default=0 )
-		data[_COMPRESSOR_RACK_KNEE_INDEX] = _option_index( compressor.knee, _THR10_CONSTANTS.THR10_KNEE_NAMES, default=0 )
+		data[_COMPRESSOR_RACK_RATIO_INDEX] = _option_index( compressor.ratio, _RATIO_OPTIONS, default=0 )
+		data[_COMPRESSOR_RACK_KNEE_INDEX] = _option_index( compressor.knee, _KNEE_OPTIONS, default=0 )
 		_set_midi_int( data, _COMPRESSOR_RACK_OUTPUT_INDEX, _limit_value( compressor.output, limits['output'] ) )
 
 
-def _apply_modulation( data: list, modulation: ModulationState ) -> None:
+def _apply_modulation( data: bytearray, modulation: ModulationState ) -> None:
 	kind = _infer_modulation_kind( modulation )
-	kind_index = _option_index( kind, _THR10_CONSTANTS.THR10_MODULATION_NAMES, default=0 )
+	kind_index = _option_index( kind, _MODULATION_OPTIONS, default=0 )
 	data[_MODULATION_TYPE_INDEX] = kind_index
 	data[_MODULATION_ON_INDEX] = _on_off_value( modulation.on )
 	if kind_index == 0:
@@ -365,8 +386,8 @@ def _apply_modulation( data: list, modulation: ModulationState ) -> None:
 		data[_MODULATION_FEEDBACK_INDEX] = _limit_value( modulation.feedback, limits['feedback'] )
 
 
-def _apply_delay( data: list, delay: DelayState ) -> None:
-	limits = _THR10_CONSTANTS.THR10_STREAM_LIMITS['delay']
+def _apply_delay( data: bytearray, delay: DelayState ) -> None:
+	limits = _DELAY_LIMITS
 	data[_DELAY_ON_INDEX] = _on_off_value( delay.on )
 	_set_midi_int( data, _DELAY_TIME_INDEX, _limit_value( delay.time, limits['time'] ) )
 	data[_DELAY_FEEDBACK_INDEX] = _limit_value( delay.feedback, limits['feedback'] )
@@ -375,13 +396,13 @@ def _apply_delay( data: list, delay: DelayState ) -> None:
 	data[_DELAY_LEVEL_INDEX] = _limit_value( delay.level, limits['level'] )
 
 
-def _apply_reverb( data: list, reverb: ReverbState ) -> None:
+def _apply_reverb( data: bytearray, reverb: ReverbState ) -> None:
 	kind = _infer_reverb_kind( reverb )
-	kind_index = _option_index( kind, _THR10_CONSTANTS.THR10_REVERB_NAMES, default=0 )
+	kind_index = _option_index( kind, _REVERB_OPTIONS, default=0 )
 	data[_REVERB_TYPE_INDEX] = kind_index
 	data[_REVERB_ON_INDEX] = _on_off_value( reverb.on )
 	if kind_index in [0, 1, 2]:
-		limits = _THR10_CONSTANTS.THR10_STREAM_LIMITS['reverb']
+		limits = _REVERB_LIMITS
 		_set_midi_int( data, _REVERB_TIME_INDEX, _limit_value( reverb.time, limits['time'] ) )
 		_set_midi_int( data, _REVERB_PRE_INDEX, _limit_value( reverb.pre, limits['pre'] ) )
 		_set_midi_int( data, _REVERB_LOW_CUT_INDEX, _limit_value( reverb.low_cut, limits['low cut'] ) )
@@ -390,27 +411,42 @@ def _apply_reverb( data: list, reverb: ReverbState ) -> None:
 		data[_REVERB_LOW_RATIO_INDEX] = _limit_value( reverb.low_ratio, limits['low ratio'] )
 		data[_REVERB_LEVEL_INDEX] = _limit_value( reverb.level, limits['level'] )
 	else:
-		limits = _THR10_CONSTANTS.THR10_STREAM_LIMITS['reverb']
+		limits = _REVERB_LIMITS
 		data[_REVERB_SPRING_REVERB_INDEX] = _limit_value( reverb.reverb, limits['reverb'] )
 		data[_REVERB_SPRING_FILTER_INDEX] = _limit_value( reverb.filter, limits['filter'] )
 
 
-def _apply_gate( data: list, gate: GateState ) -> None:
-	limits = _THR10_CONSTANTS.THR10_STREAM_LIMITS['gate']
+def _apply_gate( data: bytearray, gate: GateState ) -> None:
+	limits = _GATE_LIMITS
 	data[_GATE_ON_INDEX] = _on_off_value( gate.on )
 	data[_GATE_THRESHOLD_INDEX] = _limit_value( gate.threshold, limits['threshold'] )
 	data[_GATE_RELEASE_INDEX] = _limit_value( gate.release, limits['release'] )
 
 
-def _encode_midi_int( value: int ) -> list:
-	vab = _struct.pack( '!I', _sysex_tones.convert_to_midi_int( value ) )
-	return [vab[2], vab[3]]
+def _amp_data_to_strings( data: bytearray, comment: str ) -> list[str]:
+	return [_convert_data.amp_data_to_string( data, comment ), _convert_data.control_data_to_string( data )]
+
+
+def _cab_data_to_strings( data: bytearray, comment: str ) -> list[str]:
+	return [_convert_data.cab_data_to_string( data, comment )]
+
+
+# (group, data builder, text serializer) for each device settings group, in text settings order
+_GROUP_SERIALIZERS = (
+	('amp', _apply_amp, _amp_data_to_strings),
+	('cab', _apply_cab, _cab_data_to_strings),
+	('compressor', _apply_compressor, _convert_data.compressor_data_to_strings),
+	('modulation', _apply_modulation, _convert_data.modulation_data_to_strings),
+	('delay', _apply_delay, _convert_data.delay_data_to_strings),
+	('reverb', _apply_reverb, _convert_data.reverb_data_to_strings),
+	('gate', _apply_gate, _convert_data.gate_data_to_strings),
+)
 
 
-def _set_midi_int( data: list, start_index: int, value: int ) -> None:
-	encoded = _encode_midi_int( value )
-	data[start_index] = encoded[0]
-	data[start_index + 1] = encoded[1]
+def _set_midi_int( data: bytearray, start_index: int, value: int ) -> None:
+	midi_int = _sysex_tones.convert_to_midi_int( value )
+	data[start_index] = (midi_int >> 8) & 0xff
+	data[start_index + 1] = midi_int & 0xff
 
 
 def _limit_value( value: Optional[int], limits: list[int] ) -> int:
@@ -419,26 +455,18 @@ def _limit_value( value: Optional[int], limits: list[int] ) -> int:
 	return _sysex_tones.get_minmax( value, limits[0], limits[1] )
 
 
-def _option_index( value: Optional[str], options: list[str], default: int = 0 ) -> int:
+def _option_index( value: Optional[str], options: dict, default: int = 0 ) -> int:
 	if value is None:
 		return default
 	if isinstance( value, int ):
 		return _sysex_tones.get_minmax( value, 0, len( options ) - 1 )
-	value_lower = value.lower()
-	for index, option in enumerate( options ):
-		if option.lower() == value_lower:
-			return index
-	return default
+	return options.get( value.lower(), (default, None) )[0]
 
 
-def _canonical_option( value: Optional[str], options: list[str] ) -> Optional[str]:
+def _canonical_option( value: Optional[str], options: dict ) -> Optional[str]:
 	if not value:
 		return None
-	value_lower = value.lower()
-	for option in options:
-		if option.lower() == value_lower:
-			return option
-	return value
+	return options.get( value.lower(), (None, value) )[1]
 
 
 def _on_off_value( value: Optional[bool] ) -> int:
@@ -456,16 +484,13 @@ def _parse_on_off( values: dict ) -> Optional[bool]:
 
 
 def _first_key( values: dict ) -> Optional[str]:
-	for key in values.keys():
-		return key
-	return None
+	return next( iter( values ), None )
 
 
-def _first_match( values: dict, options: list[str] ) -> Optional[str]:
-	lowered = {option.lower(): option for option in options}
-	for key in values.keys():
-		if key in lowered:
-			return lowered[key]
+def _first_match( values: dict, options: dict ) -> Optional[str]:
+	for key in values:
+		if key in options:
+			return options[key][1]
 	return None
 
 
@@ -488,6 +513,83 @@ def _assign_int_fields( target, values: dict, keys: list[str] ) -> None:
 			setattr( target, key.replace( ' ', '_' ), values[key] )
 
 
+def _parse_name_setting( state: THR10State, valuelist: str, values: dict ) -> None:
+	state.name = valuelist.strip()
+
+
+def _parse_edited_setting( state: THR10State, valuelist: str, values: dict ) -> None:
+	state.edited = _parse_on_off( values )
+
+
+def _parse_stored_setting( state: THR10State, valuelist: str, values: dict ) -> None:
+	state.stored = _parse_on_off( values )
+
+
+def _parse_amp_setting( state: THR10State, valuelist: str, values: dict ) -> None:
+	state.amp.model = _canonical_option( _first_key( values ), _AMP_OPTIONS )
+
+
+def _parse_control_setting( state: THR10State, valuelist: str, values: dict ) -> None:
+	_assign_int_fields( state.amp, values, ['gain', 'master', 'bass', 'middle', 'treble'] )
+
+
+def _parse_cab_setting( state: THR10State, valuelist: str, values: dict ) -> None:
+	state.cab.model = _canonical_option( _first_key( values ), _CAB_OPTIONS )
+
+
+def _parse_compressor_setting( state: THR10State, valuelist: str, values: dict ) -> None:
+	state.compressor.on = _merge_bool( state.compressor.on, _parse_on_off( values ) )
+	compressor_type = _first_match( values, _COMPRESSOR_OPTIONS )
+	if compressor_type:
+		state.compressor.kind = compressor_type
+	_assign_int_fields( state.compressor, values, ['sustain', 'output', 'threshold', 'attack', 'release'] )
+	state.compressor.ratio = _canonical_option( _value_or_key( values, 'ratio' ), _RATIO_OPTIONS )
+	state.compressor.knee = _canonical_option( _value_or_key( values, 'knee' ), _KNEE_OPTIONS )
+
+
+def _parse_modulation_setting( state: THR10State, valuelist: str, values: dict ) -> None:
+	state.modulation.on = _merge_bool( state.modulation.on, _parse_on_off( values ) )
+	modulation_type = _first_match( values, _MODULATION_OPTIONS )
+	if modulation_type:
+		state.modulation.kind = modulation_type
+	_assign_int_fields( state.modulation, values, ['speed', 'depth', 'mix', 'manual', 'feedback', 'spread', 'freq'] )
+
+
+def _parse_delay_setting( state: THR10State, valuelist: str, values: dict ) -> None:
+	state.delay.on = _merge_bool( state.delay.on, _parse_on_off( values ) )
+	_assign_int_fields( state.delay, values, ['time', 'feedback', 'high cut', 'low cut', 'level'] )
+
+
+def _parse_reverb_setting( state: THR10State, valuelist: str, values: dict ) -> None:
+	state.reverb.on = _merge_bool( state.reverb.on, _parse_on_off( values ) )
+	reverb_type = _first_match( values, _REVERB_OPTIONS )
+	if reverb_type:
+		state.reverb.kind = reverb_type
+	_assign_int_fields( state.reverb, values, ['time', 'pre', 'low cut', 'high cut', 'high ratio', 'low ratio', 'level', 'reverb', 'filter'] )
+
+
+def _parse_gate_setting( state: THR10State, valuelist: str, values: dict ) -> None:
+	state.gate.on = _merge_bool( state.gate.on, _parse_on_off( values ) )
+	_assign_int_fields( state.gate, values, ['threshold', 'release'] )
+
+
+# text settings label -> parser that applies it to a THR10State
+_SETTING_HANDLERS = {
+	'name': _parse_name_setting,
+	'edited': _parse_edited_setting,
+	'edit': _parse_edited_setting,
+	'stored': _parse_stored_setting,
+	'amp': _parse_amp_setting,
+	'control': _parse_control_setting,
+	'cab': _parse_cab_setting,
+	'compressor': _parse_compressor_setting,
+	'modulation': _parse_modulation_setting,
+	'delay': _parse_delay_setting,
+	'reverb': _parse_reverb_setting,
+	'gate': _parse_gate_setting,
+}
+
+
 def _infer_compressor_kind( compressor: CompressorState ) -> str:
 	if compressor.kind:
 		return compressor.kind
@@ -524,24 +626,28 @@ def _boolean_setting_to_string( label: str, value: bool ) -> str:
 	return '%s: %s' % (label, _sysex_tones.ternary_operator( value, 'On', 'Off' ))
 
 
-def _diff_values( live, staged, path: str, diffs: dict ) -> None:
+def _diff_values( live, staged, diffs: dict ) -> None:
 	if staged is None:
 		return
-	if is_dataclass( staged ):
-		live_value = live if is_dataclass( live ) else None
-		for field_item in fields( staged ):
-			field_name = field_item.name
-			next_path = '%s.%s' % (path, field_name) if path else field_name
-			_diff_values( getattr( live_value, field_name, None ), getattr( staged, field_name ), next_path, diffs )
-		return
-	if isinstance( staged, dict ):
-		live_dict = live or {}
-		for key, value in staged.items():
-			next_path = '%s.%s' % (path, key) if path else str( key )
-			_diff_values( live_dict.get( key ), value, next_path, diffs )
-		return
-	if live != staged:
-		diffs[path] = {'live': live, 'staged': staged}
+	if live is None:
+		live = THR10State()
+	for group_getter, empty_group, group_fields in _DIFF_GROUPS:
+		if group_getter is None:
+			staged_group = staged
+			live_group = live
+		else:
+			staged_group = group_getter( staged )
+			# an untouched group has nothing staged, skip it with one generated __eq__
+			if staged_group == empty_group:
+				continue
+			live_group = group_getter( live )
+		for path, getter in group_fields:
+			staged_value = getter( staged_group )
+			if staged_value is None:
+				continue
+			live_value = getter( live_group )
+			if live_value != staged_value:
+				diffs[path] = {'live': live_value, 'staged': staged_value}
 
 
 def _merge_dataclasses( live, staged ):
@@ -549,15 +655,13 @@ def _merge_dataclasses( live, staged ):
 		return live
 	if live is None:
 		return staged
-	if is_dataclass( staged ):
-		kwargs = {}
-		for field_item in fields( staged ):
-			name = field_item.name
-			kwargs[name] = _merge_dataclasses( getattr( live, name, None ), getattr( staged, name, None ) )
-		return staged.__class__( **kwargs )
-	if isinstance( staged, dict ):
-		merged = dict( live or {} )
-		for key, value in staged.items():
-			merged[key] = _merge_dataclasses( merged.get( key ), value )
-		return merged
-	return staged if staged is not None else live
+	changes = {group: {} for group in _STATE_GROUPS}
+	changes[None] = {}
+	for _path, group, name, getter in _STATE_FIELDS:
+		value = getter( staged )
+		if value is not None:
+			changes[group][name] = value
+	kwargs = changes[None]
+	for group in _STATE_GROUPS:
+		kwargs[group] = replace( getattr( live, group ), **changes[group] )
+	return replace( live, **kwargs )
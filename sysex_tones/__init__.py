@@ -72,7 +72,9 @@ def convert_bytes_to_hex_string( data ):
 
 
 def convert_to_stream( data ):
-	""" Convert data into a bytearray, for .write() compatibility. """
+	""" Convert data into a bytearray, for .write() compatibility. Bytes-like data is returned as is. """
+	if isinstance( data, (bytes, bytearray, memoryview) ):
+		return data
 	return bytearray( data )
 
 
@@ -169,7 +171,7 @@ def extract_sysex_from_stream( inputfile, maxsize=4096 ):
 
 def is_data_available( infile, timeout=0.3 ):
 	""" Check infile for available data, using timeout to wait for n.n seconds, returning an empty sequence if no data is available. """
-	return _select.select( [infile], [], [], timeout ) # check for available data
+	return _select.select( [infile], [], [], timeout )[0] # check for available data
 
 
 def open_output_stream( filename ):
@@ -1,16 +1,27 @@
 """Shared THR10 application behaviors for CLI and examples."""
 
 import errno
+import functools
+import io
+import os
+import queue
+import select
 import sys
+import threading
+import time
 
 import sysex_tones
 import sysex_tones.THR
 
 from sysex_tones.THR import CONSTANTS as _THR_CONSTANTS
 from sysex_tones.THR10 import THR10
+from sysex_tones.THR10 import convert_data as _convert_data
 from sysex_tones.THR10 import state as thr10_state
 
 
+# models monitor_thr reports without a "not recognized" warning
+_RECOGNIZED_MODELS = frozenset((_THR_CONSTANTS.THR10_MODEL_NAME,))
+
 USAGE_TEXT = """Usage:
   apps.py monitor MIDIINPUTDEVFILENAME
   apps.py view MIDIINPUTDEVFILENAME MIDIOUTPUTDEVFILENAME
@@ -27,6 +38,36 @@ def _log(verbose, message):
 		print(message)
 
 
+def _wait_readable(thr, timeout_ms=100):
+	"""Wait up to timeout_ms for MIDI input, returning False if nothing arrived."""
+	try:
+		fileno = thr.infile.fileno()
+	except (AttributeError, ValueError, io.UnsupportedOperation):
+		# no pollable fd, fall back to a short sleep and let extract_dump() check
+		time.sleep(0.01)
+		return True
+	poller = select.poll()
+	poller.register(fileno, select.POLLIN | select.POLLERR)
+	return bool(poller.poll(timeout_ms))
+
+
+def _write_file(filename, data):
+	"""Write bytes to filename with os.write, replacing any existing file (created 0o666 less umask, like open())."""
+	fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+	try:
+		view = memoryview(data)
+		while view:
+			view = view[os.write(fd, view):]
+	finally:
+		os.close(fd)
+
+
+def _print_lines(lines):
+	"""Print text lines to stdout with a single write."""
+	if lines:
+		sys.stdout.write('\n'.join(lines) + '\n')
+
+
 def _state_from_lines(lines):
 	"""Parse text settings into a THR10State."""
 	return thr10_state.from_text_settings(lines)
@@ -37,69 +78,136 @@ def _state_to_lines(state):
 	return thr10_state.to_text_settings(state)
 
 
-def _write_text_lines(thr, lines):
-	"""Write text settings lines to a THR device."""
-	payload = []
+def _text_lines_payload(lines):
+	"""Convert text settings lines into a single MIDI payload."""
+	payload = bytearray()
+	extend = payload.extend
 	for line in lines:
 		command = sysex_tones.THR10.convert_text_to_midi(line)
 		if command:
-			payload += command
-	if payload:
-		thr.write_data_to_outfile(payload)
+			extend(command)
+	return payload
+
+
+@functools.lru_cache(maxsize=32)
+def _compiled_payload(raw):
+	"""Return the MIDI payload for the raw bytes of a text settings file."""
+	lines = raw.decode('utf-8', errors='ignore').splitlines()
+	return bytes(_text_lines_payload(_state_to_lines(_state_from_lines(lines))))
 
 
 def _replace_dump_data(sysex, data):
 	"""Replace the dump data payload in a SysEx dump and refresh the checksum."""
-	updated = sysex[:]
+	updated = bytearray(sysex)
 	start = _THR_CONSTANTS.THR_DUMP_OFFSET
 	end = start + _THR_CONSTANTS.THR_SYSEX_SIZE
 	updated[start:end] = data[:_THR_CONSTANTS.THR_SYSEX_SIZE]
 	payload_start = len(_THR_CONSTANTS.THR_DUMP_HEADER_PREFIX)
-	updated[-2] = sysex_tones.THR.calculate_checksum(updated[payload_start:-2])
+	with memoryview(updated) as view:
+		updated[-2] = sysex_tones.THR.calculate_checksum(view[payload_start:-2])
 	return updated
 
 
+def _classify_sysex(sysex):
+	"""Classify a SysEx message by prefix and size as heartbeat, dump, command or unknown."""
+	if sysex[:len(_THR_CONSTANTS.THR_HEARTBEAT_PREFIX)] == _THR_CONSTANTS.THR_HEARTBEAT_PREFIX:
+		return 'heartbeat'
+	if len(sysex) in (_THR_CONSTANTS.THR_DUMP_SIZE, _THR_CONSTANTS.THR_FILE_SIZE):
+		return 'dump'
+	if sysex[:len(_THR_CONSTANTS.THR_COMMAND_PREFIX)] == _THR_CONSTANTS.THR_COMMAND_PREFIX:
+		return 'command'
+	if sysex[:len(_THR_CONSTANTS.THR_SYSTEM_COMMAND_PREFIX)] == _THR_CONSTANTS.THR_SYSTEM_COMMAND_PREFIX:
+		return 'command'
+	return 'unknown'
+
+
+def _handle_heartbeat(thr, sysex, status):
+	"""Report the model from the first heartbeat."""
+	if sysex == status['heartbeat']:
+		# the device repeats the same heartbeat, no need to parse it again
+		return
+	heartbeat = thr.find_thr_heartbeat_model(sysex)
+	if not heartbeat:
+		_handle_unknown(thr, sysex, status)
+	elif not status['model']:
+		status['model'] = heartbeat
+		status['heartbeat'] = sysex
+		status['out']('Model %s\n' % (heartbeat))
+		if heartbeat not in _RECOGNIZED_MODELS:
+			status['out']('%s are not recognized.\n' % (heartbeat))
+
+
+def _handle_dump(thr, sysex, status):
+	"""Print a settings dump, or try the message as a command if it isn't one."""
+	detected = thr.detect_midi_dump(sysex)
+	if detected:
+		_log(status['verbose'], 'Detected settings dump.')
+		thr.print_sysex_data(sysex, detected['data'])
+	else:
+		_handle_command(thr, sysex, status)
+
+
+def _handle_command(thr, sysex, status):
+	"""Print a THR command and track its context for subcommands."""
+	command = thr.find_thr_command(sysex, status['context'])
+	if command:
+		_log(status['verbose'], 'Detected THR command.')
+		status['out']('THR command %s\n' % (str(command)))
+		if 'context' in command:
+			status['context'] = command['context']
+	else:
+		_handle_unknown(thr, sysex, status)
+
+
+def _handle_unknown(thr, sysex, status):
+	"""Print an unrecognized message in hexadecimal."""
+	status['out']('unrecognized %s %s\n' % (status['context'], sysex_tones.convert_bytes_to_hex_string(sysex)))
+
+
+# monitor_thr handlers, by _classify_sysex kind
+_DISPATCH = {
+	'heartbeat': _handle_heartbeat,
+	'dump': _handle_dump,
+	'command': _handle_command,
+	'unknown': _handle_unknown,
+}
+
+
+def _read_sysex_into(thr, messages):
+	"""Queue SysEx messages read from thr, ending with the exception that stopped reading."""
+	extract = thr.extract_sysex_from_infile
+	while True:
+		try:
+			for sysex in extract():
+				messages.put(sysex)
+		except IOError as error:
+			if error.errno != errno.EAGAIN:
+				messages.put(error)
+				return
+		except Exception as error:
+			messages.put(error)
+			return
+
+
 def monitor_thr(midi_in, verbose=False):
 	"""Monitor incoming MIDI data and print recognized THR messages."""
 	_log(verbose, 'Opening MIDI input: %s' % (midi_in))
 	thr = THR10()
 	thr.open_infile_wait_indefinitely(midi_in)
-	recognized = [sysex_tones.THR.CONSTANTS.THR10_MODEL_NAME]
-	model = ''
-	context = ''
-	while thr:
-		try:
-			for sysex in thr.extract_sysex_from_infile():
-				heartbeat = thr.find_thr_heartbeat_model(sysex)
-				if heartbeat:
-					if not model:
-						model = heartbeat
-						print('Model %s' % (model))
-						if model not in recognized:
-							print('%s are not recognized.' % (model))
-				else:
-					detected = thr.detect_midi_dump(sysex)
-					if detected:
-						_log(verbose, 'Detected settings dump.')
-						thr.print_sysex_data(sysex, detected['data'])
-					else:
-						command = thr.find_thr_command(sysex, context)
-						if command:
-							_log(verbose, 'Detected THR command.')
-							print('THR command', command)
-							if 'context' in command:
-								context = command['context']
-						else:
-							print(
-								'unrecognized',
-								context,
-								sysex_tones.convert_bytes_to_hex_string(sysex),
-							)
-		except IOError as error:
-			if error.errno != errno.EAGAIN:
-				_log(verbose, 'MIDI input closed.')
-				thr.close_infile()
-				thr = None
+	# one bound write per message, instead of print() writing each argument separately
+	status = {'model': '', 'heartbeat': None, 'context': '', 'verbose': verbose, 'out': sys.stdout.write}
+	messages = queue.SimpleQueue()
+	reader = threading.Thread(target=_read_sysex_into, args=(thr, messages), daemon=True)
+	reader.start()
+	while True:
+		sysex = messages.get()
+		if isinstance(sysex, Exception):
+			if not isinstance(sysex, IOError):
+				raise sysex
+			_log(verbose, 'MIDI input closed.')
+			thr.close_infile()
+			break
+		_DISPATCH[_classify_sysex(sysex)](thr, sysex, status)
 
 
 def view_current_settings(midi_in, midi_out, verbose=False):
@@ -111,13 +219,14 @@ def view_current_settings(midi_in, midi_out, verbose=False):
 	thr.request_current_settings(midi_out)
 	while thr:
 		try:
+			if not _wait_readable(thr):
+				continue
 			attempt = thr.extract_dump()
 			if attempt:
 				_log(verbose, 'Received settings dump.')
 				lines = sysex_tones.THR10.convert_midi_dump_to_text(attempt['dump'])
 				state = _state_from_lines(lines)
-				for line in _state_to_lines(state):
-					print(line)
+				_print_lines(_state_to_lines(state))
 				thr.close_infile()
 				thr = None
 		except IOError as error:
@@ -131,12 +240,14 @@ def write_config_files(midi_out, config_files, verbose=False):
 	_log(verbose, 'Opening MIDI output: %s' % (midi_out))
 	thr = THR10()
 	thr.open_outfile(midi_out)
+	payload = bytearray()
 	for infilename in config_files:
 		_log(verbose, 'Writing config: %s' % (infilename))
-		with open(infilename, 'r', encoding='utf-8', errors='ignore') as infile:
-			lines = infile.read().splitlines()
-		state = _state_from_lines(lines)
-		_write_text_lines(thr, _state_to_lines(state))
+		with open(infilename, 'rb') as infile:
+			payload += _compiled_payload(infile.read())
+	if payload:
+		# one write for all config files
+		thr.write_data_to_outfile(memoryview(payload))
 	thr.close_outfile()
 
 
@@ -148,8 +259,7 @@ def dump_thr_files(input_files, verbose=False):
 		lines = thr.convert_infile_to_text(infilename)
 		if lines:
 			state = _state_from_lines(lines)
-			for line in _state_to_lines(state):
-				print(line)
+			_print_lines(_state_to_lines(state))
 		else:
 			print('No THR SysEx found.')
 
@@ -164,12 +274,13 @@ def save_settings_dumps(midi_in, midi_out, postfix, verbose=False):
 	count = 0
 	while thr:
 		try:
+			if not _wait_readable(thr):
+				continue
 			attempt = thr.extract_dump()
 			if attempt:
 				savefilename = '%i_%s' % (count, postfix)
 				_log(verbose, 'Saving dump to %s' % (savefilename))
-				with open(savefilename, 'wb') as savefile:
-					savefile.write(bytearray(attempt['dump']))
+				_write_file(savefilename, bytes(attempt['dump']))
 				count += 1
 		except IOError as error:
 			if error.errno == errno.ENODEV:
@@ -183,26 +294,29 @@ def rename_current_settings(midi_in, midi_out, new_name, verbose=False):
 	_log(verbose, 'Opening MIDI input: %s' % (midi_in))
 	_log(verbose, 'Opening MIDI output: %s' % (midi_out))
 	_log(verbose, 'Renaming settings to: %s' % (new_name))
-	thr = sysex_tones.THR10.THR10(midi_in, midi_out)
+	thr = THR10(midi_in, midi_out)
 	thr.open_infile_wait_indefinitely()
 	thr.request_current_settings()
 	while thr:
 		try:
+			if not _wait_readable(thr):
+				continue
 			attempt = thr.extract_dump()
 			if attempt:
 				_log(verbose, 'Received settings dump.')
 				lines = sysex_tones.THR10.convert_midi_dump_to_text(attempt['dump'])
 				state = _state_from_lines(lines)
-				for line in _state_to_lines(state):
-					print(line)
+				lines = _state_to_lines(state)
+				_print_lines(lines)
 				state.name = new_name.strip()
 				updated_data = thr10_state.to_midi_data(state)
+				# only the name changed, the name line always comes first
+				lines[0] = _convert_data.name_data_to_string(updated_data)
 				newsysex = _replace_dump_data(attempt['sysex'], updated_data)
 				detected = thr.detect_midi_dump(newsysex)
 				if detected:
 					_log(verbose, 'Writing renamed settings.')
-					for line in _state_to_lines(state):
-						print(line)
+					_print_lines(lines)
 					thr.write_data_to_outfile(newsysex)
 					thr.close_infile()
 					thr = None
@@ -1,9 +1,10 @@
 """Command-line utilities for THR SysEx operations."""
 
 import argparse
+import functools
 import sys
 
-from sysex_tones import apps as thr_apps
+# sysex_tones.apps is imported inside each cmd_* function, so --help doesn't load the device modules
 
 
 EXAMPLE_TEXT = """
@@ -26,6 +27,7 @@ def _require(value, label):
 
 def cmd_monitor(args):
 	"""Monitor incoming MIDI data and print recognized THR messages."""
+	from sysex_tones import apps as thr_apps
 	midi_in = _require(args.midi_in, 'MIDI input device filename')
 	thr_apps.monitor_thr(midi_in, verbose=args.verbose)
 	return 0
@@ -33,6 +35,7 @@ def cmd_monitor(args):
 
 def cmd_view(args):
 	"""Request and display the current THR settings."""
+	from sysex_tones import apps as thr_apps
 	midi_in = _require(args.midi_in, 'MIDI input device filename')
 	midi_out = _require(args.midi_out, 'MIDI output device filename')
 	thr_apps.view_current_settings(midi_in, midi_out, verbose=args.verbose)
@@ -41,6 +44,7 @@ def cmd_view(args):
 
 def cmd_write(args):
 	"""Send text settings files to the THR device."""
+	from sysex_tones import apps as thr_apps
 	midi_out = _require(args.midi_out, 'MIDI output device filename')
 	config_files = []
 	if args.config_files:
@@ -55,6 +59,7 @@ def cmd_write(args):
 
 def cmd_dump(args):
 	"""Convert THR dump or SysEx files into text settings."""
+	from sysex_tones import apps as thr_apps
 	input_files = []
 	if args.input_files:
 		input_files.extend(args.input_files)
@@ -68,6 +73,7 @@ def cmd_dump(args):
 
 def cmd_save_dumps(args):
 	"""Save any settings dumps to numbered files."""
+	from sysex_tones import apps as thr_apps
 	midi_in = _require(args.midi_in, 'MIDI input device filename')
 	midi_out = _require(args.midi_out, 'MIDI output device filename')
 	postfix = _require(args.postfix, 'output filename postfix')
@@ -77,6 +83,7 @@ def cmd_save_dumps(args):
 
 def cmd_rename(args):
 	"""Change the name of the current THR settings and write it back."""
+	from sysex_tones import apps as thr_apps
 	midi_in = _require(args.midi_in, 'MIDI input device filename')
 	midi_out = _require(args.midi_out, 'MIDI output device filename')
 	new_name = _require(args.new_name, 'new settings name')
@@ -98,8 +105,9 @@ def _add_io_arguments(parser, needs_out=False, needs_postfix=False, needs_name=F
 		parser.add_argument('--name', dest='new_name', help='New settings name')
 
 
+@functools.lru_cache(maxsize=1)
 def build_parser():
-	"""Build the CLI parser."""
+	"""Build the CLI parser, once per process."""
 	parent_parser = argparse.ArgumentParser(add_help=False)
 	parent_parser.add_argument(
 		'-v',
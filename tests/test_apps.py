@@ -0,0 +1,136 @@
+"""Tests for sysex_tones.apps monitor dispatch and dump saving."""
+
+import errno
+import os
+import stat
+
+import pytest
+
+import sysex_tones
+import sysex_tones.THR
+import sysex_tones.THR10
+
+from sysex_tones import apps
+from sysex_tones.THR import CONSTANTS as THR_CONSTANTS
+from sysex_tones.THR10 import state as thr10_state
+
+
+class FakeMonitorTHR( sysex_tones.THR10.THR10 ):
+	"""THR10 whose MIDI input is a fixed list of reads, then raises the given exception."""
+
+	reads = []
+	error = IOError( errno.ENODEV, 'No such device' )
+	instances = []
+
+	def __init__( self, infilename=None, outfilename=None ):
+		sysex_tones.THR10.THR10.__init__( self, infilename, outfilename )
+		self.pending = list( self.reads )
+		self.closed = False
+		self.heartbeat_parses = 0
+		FakeMonitorTHR.instances.append( self )
+
+	def open_infile_wait_indefinitely( self, infilename=None ):
+		pass
+
+	def close_infile( self ):
+		self.closed = True
+
+	def extract_sysex_from_infile( self ):
+		if not self.pending:
+			raise self.error
+		retval = self.pending.pop( 0 )
+		if isinstance( retval, Exception ):
+			raise retval
+		return retval
+
+	def find_thr_heartbeat_model( self, data ):
+		self.heartbeat_parses += 1
+		return sysex_tones.THR10.THR10.find_thr_heartbeat_model( data )
+
+
+@pytest.fixture
+def fake_thr( monkeypatch ):
+	FakeMonitorTHR.instances = []
+	monkeypatch.setattr( apps, 'THR10', FakeMonitorTHR )
+	return FakeMonitorTHR
+
+
+def _dump_sysex( name ):
+	body = THR_CONSTANTS.THR_DUMP_HEADER + thr10_state.to_midi_data( thr10_state.THR10State( name=name ) )
+	checksum = sysex_tones.THR.calculate_checksum( body[len( THR_CONSTANTS.THR_DUMP_HEADER_PREFIX ):] )
+	return body + [checksum] + THR_CONSTANTS.THR_SYSEX_STOP
+
+
+def _commands( line ):
+	return sysex_tones.extract_midi_sysex( sysex_tones.THR10.convert_text_to_midi( line ) )
+
+
+def test_monitor_dispatches_every_message_kind( fake_thr, monkeypatch, capsys ):
+	dump = _dump_sysex( 'Monitor' )
+	bad_dump = dump[:-2] + [(dump[-2] + 1) & 0x7f] + THR_CONSTANTS.THR_SYSEX_STOP
+	unknown_heartbeat = THR_CONSTANTS.THR_HEARTBEAT_PREFIX + [0x39] + THR_CONSTANTS.THR_SYSEX_STOP
+	system_command = THR_CONSTANTS.THR_SYSTEM_COMMAND_PREFIX + [0x00, 0x00] + THR_CONSTANTS.THR_SYSEX_STOP
+	garbage = [0xf0, 0x01, 0x02, 0x03, 0xf7]
+	monkeypatch.setattr( fake_thr, 'reads', [
+		[THR_CONSTANTS.THR10_HEARTBEAT, THR_CONSTANTS.THR5_HEARTBEAT, unknown_heartbeat],
+		IOError( errno.EAGAIN, 'Resource temporarily unavailable' ),
+		[dump, bad_dump],
+		_commands( 'Amp: Crunch' ) + _commands( 'Compressor: Rack, Threshold 10' ),
+		[system_command, garbage],
+	] )
+	apps.monitor_thr( 'midi-in' )
+	thr = fake_thr.instances[0]
+	assert thr.closed
+	expected = [
+		'Model THR10',
+		'unrecognized  %s' % (sysex_tones.convert_bytes_to_hex_string( unknown_heartbeat )),
+		sysex_tones.convert_bytes_to_hex_string( dump ),
+	] + sysex_tones.THR10.convert_midi_dump_to_text( dump[THR_CONSTANTS.THR_DUMP_OFFSET:-2] ) + [
+		'unrecognized  %s' % (sysex_tones.convert_bytes_to_hex_string( bad_dump )),
+		"THR command {'control': 'amp', 'name': 'crunch'}",
+		"THR command {'control': 'compressor', 'name': 'rack', 'context': 'rack'}",
+		"THR command {'control': 'rack', 'name': 'threshold', 'context': 'rack', 'value': 10}",
+		"THR command {'control': 'wide', 'name': 'on'}",
+		'unrecognized rack f0 01 02 03 f7',
+	]
+	assert capsys.readouterr().out.splitlines() == expected
+
+
+def test_monitor_warns_about_unrecognized_models( fake_thr, monkeypatch, capsys ):
+	monkeypatch.setattr( fake_thr, 'reads', [[THR_CONSTANTS.THR5_HEARTBEAT, THR_CONSTANTS.THR10_HEARTBEAT]] )
+	apps.monitor_thr( 'midi-in' )
+	assert capsys.readouterr().out == 'Model THR5\nTHR5 are not recognized.\n'
+
+
+def test_monitor_parses_a_repeated_heartbeat_once( fake_thr, monkeypatch, capsys ):
+	monkeypatch.setattr( fake_thr, 'reads', [[THR_CONSTANTS.THR10_HEARTBEAT] * 3, [THR_CONSTANTS.THR10_HEARTBEAT] * 2] )
+	apps.monitor_thr( 'midi-in' )
+	assert fake_thr.instances[0].heartbeat_parses == 1
+	assert capsys.readouterr().out == 'Model THR10\n'
+
+
+def test_monitor_closes_input_when_the_reader_fails( fake_thr, monkeypatch, capsys ):
+	monkeypatch.setattr( fake_thr, 'reads', [] )
+	apps.monitor_thr( 'midi-in', verbose=True )
+	assert fake_thr.instances[0].closed
+	assert capsys.readouterr().out.splitlines() == ['Opening MIDI input: midi-in', 'MIDI input closed.']
+
+
+def test_monitor_reraises_reader_errors_that_are_not_io( fake_thr, monkeypatch ):
+	monkeypatch.setattr( fake_thr, 'reads', [] )
+	monkeypatch.setattr( fake_thr, 'error', KeyError( 'broken' ) )
+	with pytest.raises( KeyError, match='broken' ):
+		apps.monitor_thr( 'midi-in' )
+	assert not fake_thr.instances[0].closed
+
+
+def test_write_file_honours_the_umask_like_open( tmp_path ):
+	filename = str( tmp_path / 'dump.syx' )
+	previous = os.umask( 0o002 )
+	try:
+		apps._write_file( filename, bytes( range( 8 ) ) )
+	finally:
+		os.umask( previous )
+	assert stat.S_IMODE( os.stat( filename ).st_mode ) == 0o664
+	with open( filename, 'rb' ) as infile:
+		assert infile.read() == bytes( range( 8 ) )
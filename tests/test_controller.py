@@ -0,0 +1,285 @@
+"""Tests for THR10Controller staging and debounced writes."""
+
+import pytest
+
+import sysex_tones.THR10
+
+from sysex_tones.THR10 import state as thr10_state
+from sysex_tones.THR10.controller import THR10Controller
+
+
+class FakeTHR:
+	"""Stand-in for a THR10 device that records writes and serves queued dumps."""
+
+	infile = None
+	outfilename = 'fake'
+
+	def __init__( self ):
+		self.writes = []
+		self.dumps = []
+
+	def write_data_to_outfile( self, data ):
+		self.writes.append( bytes( data ) )
+
+	def request_current_settings( self, outfilename=None ):
+		pass
+
+	def extract_dump( self ):
+		if self.dumps:
+			return self.dumps.pop( 0 )
+		return {}
+
+
+class FakeClock:
+
+	def __init__( self ):
+		self.now = 0.0
+
+	def __call__( self ):
+		return self.now
+
+
+def _controller():
+	clock = FakeClock()
+	controller = THR10Controller( clock=clock, debounce_seconds=0.3 )
+	controller.thr = FakeTHR()
+	controller.live_state.amp.model = 'Clean'
+	controller.live_state.amp.gain = 37
+	return controller, clock
+
+
+def test_set_param_collapses_repeated_edits():
+	controller, _clock = _controller()
+	controller.set_param( 'amp.gain', 10 )
+	controller.set_param( 'Amp/Gain', 20 )
+	controller.set_param( 'delay.high cut', 3000 )
+	assert controller.flush_debounced( force=True )
+	assert controller.live_state.amp.gain == 20
+	assert controller.live_state.delay.high_cut == 3000
+	assert len( controller.thr.writes ) == 1
+
+
+def test_set_param_rejects_unknown_paths():
+	controller, _clock = _controller()
+	with pytest.raises( ValueError ):
+		controller.set_param( '', 1 )
+	with pytest.raises( AttributeError, match='Unknown parameter group: nope' ):
+		controller.set_param( 'nope.gain', 1 )
+	with pytest.raises( AttributeError, match='Unknown parameter: nope' ):
+		controller.set_param( 'amp.nope', 1 )
+
+
+def test_flush_debounced_waits_for_idle_time():
+	controller, clock = _controller()
+	controller.set_param( 'amp.gain', 50 )
+	assert not controller.flush_debounced()
+	clock.now = 0.5
+	assert controller.flush_debounced()
+	assert controller.live_state.amp.gain == 50
+	assert not controller.flush_debounced()
+
+
+def test_apply_staged_writes_only_changed_groups():
+	controller, _clock = _controller()
+	controller.set_param( 'amp.gain', 50 )
+	controller.apply_staged()
+	expected = bytearray()
+	for line in thr10_state.to_group_text_settings( controller.live_state, {'amp'} ):
+		expected += bytearray( sysex_tones.THR10.convert_text_to_midi( line ) )
+	assert controller.thr.writes == [bytes( expected )]
+
+
+def test_discard_staged_drops_pending_edits():
+	controller, _clock = _controller()
+	controller.set_param( 'amp.gain', 50 )
+	controller.discard_staged()
+	assert not controller.flush_debounced( force=True )
+	assert controller.live_state.amp.gain == 37
+	assert controller.thr.writes == []
+
+
+def test_write_chunk_size_splits_payload_between_commands():
+	controller, _clock = _controller()
+	controller.apply_staged()
+	controller.write_chunk_size = 20
+	controller.set_param( 'amp.gain', 50 )
+	controller.set_param( 'amp.bass', 40 )
+	controller.apply_staged()
+	writes = controller.thr.writes
+	assert len( writes ) > 1
+	assert all( len( chunk ) <= 20 for chunk in writes )
+	assert all( chunk[0] == 0xf0 and chunk[-1] == 0xf7 for chunk in writes )
+	expected = bytearray()
+	for line in thr10_state.to_group_text_settings( controller.live_state, {'amp'} ):
+		expected += bytearray( sysex_tones.THR10.convert_text_to_midi( line ) )
+	assert b''.join( writes ) == bytes( expected )
+
+
+def test_apply_staged_skips_device_write_for_local_fields():
+	controller, _clock = _controller()
+	controller.set_param( 'edited', True )
+	assert controller.apply_staged()
+	assert controller.live_state.edited is True
+	assert controller.thr.writes == []
+
+
+def test_staged_edits_never_touch_the_shared_empty_state():
+	controller, _clock = _controller()
+	other, _other_clock = _controller()
+	assert controller.staged_state is not other.staged_state
+	controller.staged_state.amp.gain = 9
+	assert other.staged_state.amp.gain is None
+	assert THR10Controller().staged_state.amp.gain is None
+	controller.discard_staged()
+	assert controller.staged_state == thr10_state.THR10State()
+	controller.set_param( 'amp.gain', 50 )
+	controller.apply_staged()
+	assert other.staged_state == thr10_state.THR10State()
+	assert controller.staged_state == thr10_state.THR10State()
+	with pytest.raises( AttributeError ):
+		controller.staged_state = thr10_state.THR10State()
+
+
+def test_staged_state_shows_set_param_edits_after_a_drain():
+	controller, _clock = _controller()
+	controller.set_param( 'amp.gain', 50 )
+	assert controller.staged_state.amp.gain is None
+	controller.thr.dumps.append( _device_dump( controller.live_state ) )
+	controller.refresh_from_device()
+	assert controller.staged_state.amp.gain == 50
+
+
+def _device_dump( state ):
+	return {'dump': thr10_state.to_midi_data( state ), 'sysex': []}
+
+
+def test_refresh_reports_conflicts_with_pending_edits():
+	controller, _clock = _controller()
+	controller.set_param( 'amp.gain', 50 )
+	device = thr10_state.THR10State()
+	device.amp.model = 'Clean'
+	device.amp.gain = 60
+	controller.thr.dumps.append( _device_dump( device ) )
+	assert controller.refresh_from_device() is not None
+	assert controller.conflicts == {'amp.gain': {'live': 37, 'staged': 50, 'device': 60}}
+
+
+def test_refresh_without_staged_edits_clears_conflicts():
+	controller, _clock = _controller()
+	controller.conflicts = {'amp.gain': {}}
+	controller.thr.dumps.append( _device_dump( controller.live_state ) )
+	assert controller.refresh_from_device() is not None
+	assert controller.conflicts == {}
+	assert controller.staged_state == thr10_state.THR10State()
+
+
+def test_set_param_does_not_read_the_clock():
+	controller, clock = _controller()
+	reads = []
+	controller._clock = lambda: reads.append( clock.now ) or clock.now
+	for value in range( 30 ):
+		controller.set_param( 'amp.gain', value )
+	assert reads == []
+	assert not controller.flush_debounced()
+	clock.now = 0.2
+	controller.set_param( 'amp.gain', 99 )
+	assert not controller.flush_debounced()
+	clock.now = 0.4
+	assert not controller.flush_debounced()
+	clock.now = 0.6
+	assert controller.flush_debounced()
+	assert controller.live_state.amp.gain == 99
+
+
+def test_refresh_reuses_decoded_state_for_an_unchanged_dump():
+	controller, _clock = _controller()
+	dump = _device_dump( controller.live_state )
+	controller.thr.dumps += [dump, dict( dump )]
+	first = controller.refresh_from_device()
+	assert controller.refresh_from_device() is first
+	controller.set_param( 'amp.gain', 50 )
+	controller.apply_staged()
+	controller.thr.dumps.append( dict( dump ) )
+	third = controller.refresh_from_device()
+	assert third is not first
+	assert third.amp.gain == 37
+
+
+class TickingClock( FakeClock ):
+	"""Clock that moves forward on every read, so dump waits time out."""
+
+	def __call__( self ):
+		self.now += 0.05
+		return self.now
+
+
+def _verifying_controller():
+	controller, _clock = _controller()
+	controller._clock = TickingClock()
+	controller.poll_interval = 0.0
+	controller.thr.infile = object()
+	return controller
+
+
+def test_apply_staged_commits_live_state_once_device_confirms():
+	controller = _verifying_controller()
+	controller.set_param( 'amp.gain', 50 )
+	device = thr10_state.apply_state( controller.live_state, thr10_state.THR10State() )
+	device.amp.gain = 50
+	controller.thr.dumps.append( _device_dump( device ) )
+	assert controller.apply_staged()
+	assert controller.live_state.amp.gain == 50
+	assert controller.staged_state == thr10_state.THR10State()
+
+
+def test_apply_staged_keeps_staged_edits_when_device_disagrees():
+	controller = _verifying_controller()
+	controller.set_param( 'amp.gain', 50 )
+	controller.thr.dumps.append( _device_dump( controller.live_state ) )
+	assert not controller.apply_staged()
+	assert controller.live_state.amp.gain == 37
+	assert controller.staged_state.amp.gain == 50
+	assert not controller.apply_staged() # no answer within verify_timeout
+	assert controller.staged_state.amp.gain == 50
+	assert len( controller.thr.writes ) == 2
+
+
+def _echoing_controller():
+	controller = _verifying_controller()
+
+	def echo_written_state( outfilename=None ):
+		merged = thr10_state.apply_state( controller.live_state, controller.staged_state )
+		controller.thr.dumps.append( _device_dump( merged ) )
+
+	controller.thr.request_current_settings = echo_written_state
+	return controller
+
+
+def test_apply_staged_confirms_values_the_device_normalizes():
+	controller = _echoing_controller()
+	controller.set_param( 'amp.model', 'crunch' )
+	controller.set_param( 'cab.model', 'us2x12' )
+	controller.set_param( 'amp.gain', 150 )
+	assert controller.apply_staged()
+	assert controller.staged_state == thr10_state.THR10State()
+	assert not controller.flush_debounced( force=True )
+	assert len( controller.thr.writes ) == 1
+
+
+def test_apply_staged_stops_retrying_an_unconfirmed_write():
+	controller = _verifying_controller()
+	controller.verify_attempts = 2
+	controller.set_param( 'amp.gain', 50 )
+	for _attempt in range( 2 ):
+		controller.thr.dumps.append( _device_dump( controller.live_state ) )
+		assert not controller.apply_staged()
+	assert controller.conflicts == {'amp.gain': {'live': 37, 'staged': 50, 'device': 37}}
+	assert controller.live_state.amp.gain == 37
+	assert controller.staged_state.amp.gain == 50
+	for _flush in range( 5 ):
+		assert not controller.flush_debounced( force=True )
+	assert len( controller.thr.writes ) == 2
+	controller.set_param( 'amp.gain', 60 )
+	controller.thr.dumps.append( _device_dump( controller.live_state ) )
+	assert not controller.flush_debounced( force=True )
+	assert len( controller.thr.writes ) == 3
@@ -0,0 +1,73 @@
+"""Tests for THR10 state diffing and merging."""
+
+import os
+
+from sysex_tones.THR10 import state as thr10_state
+
+
+PRESET = os.path.join(
+	os.path.dirname( __file__ ), '..',
+	'sysex_tones_examples', 'THR10', 'tones', 'factory_presets', 'preset1.txt',
+)
+
+
+def _live_state():
+	with open( PRESET, 'r', encoding='utf-8' ) as infile:
+		return thr10_state.from_text_settings( infile.read().splitlines() )
+
+
+def _partial_staged_state():
+	staged = thr10_state.THR10State()
+	staged.name = 'Staged'
+	staged.amp.gain = 12
+	staged.amp.master = 100 # same as live, not a difference
+	staged.delay.high_cut = 3000
+	staged.gate.on = True
+	return staged
+
+
+def test_diff_state_reports_only_changed_staged_paths():
+	live = _live_state()
+	diffs = thr10_state.diff_state( live, _partial_staged_state() )
+	assert list( diffs ) == ['name', 'amp.gain', 'delay.high_cut', 'gate.on']
+	assert diffs['name'] == {'live': 'PRESET1', 'staged': 'Staged'}
+	assert diffs['amp.gain'] == {'live': 37, 'staged': 12}
+	assert diffs['delay.high_cut'] == {'live': None, 'staged': 3000}
+	assert diffs['gate.on'] == {'live': False, 'staged': True}
+
+
+def test_diff_state_of_empty_staged_state_is_empty():
+	assert thr10_state.diff_state( _live_state(), thr10_state.THR10State() ) == {}
+
+
+def test_apply_state_merges_staged_values_onto_live():
+	live = _live_state()
+	merged = thr10_state.apply_state( live, _partial_staged_state() )
+	assert merged.name == 'Staged'
+	assert merged.amp.model == 'Clean'
+	assert (merged.amp.gain, merged.amp.master, merged.amp.bass) == (12, 100, 78)
+	assert merged.cab.model == 'US2x12'
+	assert merged.delay.high_cut == 3000
+	assert merged.delay.on is False
+	assert merged.gate.on is True
+	assert thr10_state.diff_state( merged, _partial_staged_state() ) == {}
+
+
+def test_apply_state_does_not_share_groups_with_live():
+	live = _live_state()
+	merged = thr10_state.apply_state( live, thr10_state.THR10State() )
+	assert merged == live
+	assert merged.amp is not live.amp
+	merged.amp.gain = 1
+	assert live.amp.gain == 37
+
+
+def test_to_group_text_settings_matches_full_serialization():
+	live = _live_state()
+	full = thr10_state.to_text_settings( live )
+	lines = thr10_state.to_group_text_settings( live, {'amp', 'delay'} )
+	assert lines == [
+		'Amp: Clean',
+		'Control: Gain 37, Master 100, Bass 78, Middle 59, Treble 66',
+	] + [line for line in full if line.lstrip( '# ' ).startswith( 'Delay:' )]
+	assert thr10_state.to_group_text_settings( live, set() ) == []